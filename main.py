@@ -1,22 +1,37 @@
 import os
-import requests
-import psycopg2
+import asyncio
+import heapq
+import random
 import time
+import aiohttp
+import asyncpg
+import orjson
 from datetime import datetime, timedelta
+from typing import NamedTuple
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Load environment variables
 load_dotenv()
 
 # Database connection settings
 DB_CONFIG = {
-    "dbname": os.getenv("DB_NAME"),
+    "database": os.getenv("DB_NAME"),
     "user": os.getenv("DB_USER"),
     "password": os.getenv("DB_PASSWORD"),
     "host": os.getenv("DB_HOST"),            
     "port": os.getenv("DB_PORT")
 }
 
+# Store the time series as TimescaleDB hypertables (requires the timescaledb extension)
+USE_TIMESCALEDB = os.getenv("USE_TIMESCALEDB", "").lower() in ("1", "true", "yes")
+ALT_RETENTION = timedelta(days=30)  # TimescaleDB drops alt_btc_strength chunks older than this
+
 # API URLs
 COINGECKO_URL = "https://api.coingecko.com/api/v3/global"
 COINGECKO_MARKET_URL = "https://api.coingecko.com/api/v3/coins/markets?vs_currency=btc&order=market_cap_desc&per_page=25&page=1&sparkline=false"
@@ -26,146 +41,431 @@ BTC_DOMINANCE_HIGH = 55.0  # Alert if BTC Dominance goes above this
 BTC_DOMINANCE_LOW = 45.0   # Alert if BTC Dominance goes below this
 ALT_STRENGTH_CHANGE_THRESHOLD = 0.02  # Alert if ALT/BTC strength changes by this much
 ACCUMULATION_VOLUME_SPIKE = 1.5  # 1.5x average volume signals accumulation
+BTC_DOMINANCE_MIN_CHANGE = 0.01  # Skip storing BTC Dominance readings that moved less than this
+
+# Fixed alert text, built once
+HIGH_PREFIX = f"BTC Dominance has risen above {BTC_DOMINANCE_HIGH}%: "
+LOW_PREFIX = f"BTC Dominance has dropped below {BTC_DOMINANCE_LOW}%: "
+TOP_ALTS_PREFIX = "Top Alts: "
+
+# Polling schedule
+POLL_INTERVAL = 300  # Seconds between iterations
+POLL_JITTER = 5  # Up to +/- this many seconds added to each sleep
+DEFAULT_RETRY_AFTER = 60  # Seconds to wait after HTTP 429 without a usable Retry-After header
+
+# HTTP timeouts and retries for CoinGecko and Telegram calls
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=30, sock_connect=3.05, sock_read=10)
+HTTP_RETRIES = 3  # Extra attempts after a connection error, timeout or retryable status
+HTTP_BACKOFF = 0.3  # Seconds before the first retry, doubling each time
+HTTP_RETRY_STATUSES = (500, 502, 503, 504)  # 429 is left to the scheduler's Retry-After handling
 
 # Telegram settings
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 TELEGRAM_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
 
+# Shared connection pool and HTTP session, created in main()
+POOL = None
+SESSION = None
+
+# Last stored BTC Dominance and threshold state, used to skip redundant writes and alerts
+LAST_BTC_DOM = None
+LAST_ALERT_STATE = "neutral"
+
+# Set when CoinGecko rate-limits us; the next iteration is scheduled this many seconds out
+RETRY_AFTER = None
+
+# Per-URL (ETag, Last-Modified, parsed value) from the last 200 response, for conditional GETs
+HTTP_CACHE = {}
+
+# CoinGecko slug -> coins.id, filled lazily as new coins show up
+COIN_IDS = {}
+
 # Connect to PostgreSQL
-def connect_db():
-    return psycopg2.connect(**DB_CONFIG)
-
-# Create table if not exists
-def setup_database():
-    with connect_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute('''
+# Idle connections are kept open: the default 300s idle lifetime matches the
+# polling interval and would force a reconnect on nearly every iteration.
+async def connect_db():
+    return await asyncpg.create_pool(**DB_CONFIG, min_size=2, max_size=8, max_inactive_connection_lifetime=0)
+
+# Errors from a pooled connection that died while idle (NAT timeout, server restart, failover)
+DB_CONNECTION_ERRORS = (asyncpg.PostgresConnectionError, asyncpg.InterfaceError, OSError)
+
+# Run a DB call, retrying once on fresh connections if the pooled one turns out to be dead
+async def with_db_retry(func, *args):
+    try:
+        return await func(*args)
+    except DB_CONNECTION_ERRORS as e:
+        print(f"{datetime.now()} - Database connection lost ({e!r}), retrying on a fresh connection")
+        await POOL.expire_connections()
+        return await func(*args)
+
+# Shared HTTP session for CoinGecko and Telegram
+# Idle connections are kept past POLL_INTERVAL (aiohttp's default is 15s) so the next tick can
+# reuse them instead of doing a fresh TCP+TLS handshake, and DNS lookups are cached across ticks.
+# A server may still close an idle connection sooner; http_request retries the resulting error.
+def create_session():
+    connector = aiohttp.TCPConnector(
+        limit=10, limit_per_host=4, ttl_dns_cache=600, keepalive_timeout=POLL_INTERVAL + 60
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=HTTP_TIMEOUT, headers={"Accept-Encoding": "gzip"})
+
+# Create tables and indexes if not exists
+async def setup_database():
+    async with POOL.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute('''
                 CREATE TABLE IF NOT EXISTS btc_dominance (
                     id SERIAL PRIMARY KEY,
                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    btc_dominance FLOAT
+                    btc_dominance REAL
+                )
+            ''')
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS coins (
+                    id SMALLSERIAL PRIMARY KEY,
+                    slug TEXT UNIQUE NOT NULL
                 )
             ''')
-            cur.execute('''
+            await conn.execute('''
                 CREATE TABLE IF NOT EXISTS alt_btc_strength (
                     id SERIAL PRIMARY KEY,
                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    alt_id TEXT,
-                    alt_btc FLOAT,
-                    volume FLOAT
+                    coin_id SMALLINT REFERENCES coins(id),
+                    alt_btc REAL,
+                    volume REAL
                 )
             ''')
-            conn.commit()
+            await migrate_column_types(conn)
+            await migrate_alt_ids(conn)
+            if USE_TIMESCALEDB:
+                await setup_timescaledb(conn)
+            # BRIN suits the append-only timestamp column; the composite index serves per-alt window scans
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_btc_dominance_ts_brin ON btc_dominance USING BRIN (timestamp) WITH (pages_per_range = 32)
+            ''')
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_alt_btc_ts_brin ON alt_btc_strength USING BRIN (timestamp) WITH (pages_per_range = 32)
+            ''')
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_alt_btc_coin_ts ON alt_btc_strength (coin_id, timestamp DESC)
+            ''')
+            # Per-alt 7-day stats, refreshed after each ALT insert; the unique index allows REFRESH CONCURRENTLY
+            await conn.execute('''
+                CREATE MATERIALIZED VIEW IF NOT EXISTS alt_7d_stats AS
+                SELECT coin_id, first_price, latest_price, latest_volume, avg_volume, samples
+                FROM (
+                    SELECT coin_id,
+                           first_value(alt_btc) OVER w AS first_price,
+                           last_value(alt_btc) OVER w AS latest_price,
+                           last_value(volume) OVER w AS latest_volume,
+                           avg(coalesce(volume, 0)) OVER w AS avg_volume,
+                           count(*) OVER w AS samples,
+                           row_number() OVER w AS rn
+                    FROM alt_btc_strength
+                    WHERE timestamp >= LOCALTIMESTAMP - INTERVAL '7 days'
+                    WINDOW w AS (PARTITION BY coin_id ORDER BY timestamp ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+                ) s
+                WHERE rn = 1
+            ''')
+            await conn.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_alt_7d_stats_coin ON alt_7d_stats (coin_id)
+            ''')
+
+# Narrow FLOAT (8-byte) value columns from older schemas to REAL (4-byte)
+async def migrate_column_types(conn):
+    wide_columns = await conn.fetch('''
+        SELECT table_name, column_name FROM information_schema.columns
+        WHERE table_schema = current_schema()
+          AND (table_name, column_name) IN (('btc_dominance', 'btc_dominance'), ('alt_btc_strength', 'alt_btc'), ('alt_btc_strength', 'volume'))
+          AND data_type = 'double precision'
+    ''')
+    if not wide_columns:
+        return
+    # Columns used by a view can't change type; setup_database recreates it afterwards
+    await conn.execute("DROP MATERIALIZED VIEW IF EXISTS alt_7d_stats")
+    for table, column in wide_columns:
+        await conn.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE real")
+
+# Move alt_btc_strength rows from older schemas off the TEXT alt_id column onto coins
+async def migrate_alt_ids(conn):
+    has_alt_id = await conn.fetchval('''
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'alt_btc_strength' AND column_name = 'alt_id'
+        )
+    ''')
+    if not has_alt_id:
+        return
+    await conn.execute("DROP MATERIALIZED VIEW IF EXISTS alt_7d_stats")
+    await conn.execute("INSERT INTO coins (slug) SELECT DISTINCT alt_id FROM alt_btc_strength WHERE alt_id IS NOT NULL ON CONFLICT (slug) DO NOTHING")
+    await conn.execute("ALTER TABLE alt_btc_strength ADD COLUMN coin_id SMALLINT REFERENCES coins(id)")
+    await conn.execute("UPDATE alt_btc_strength a SET coin_id = c.id FROM coins c WHERE c.slug = a.alt_id")
+    await conn.execute("ALTER TABLE alt_btc_strength DROP COLUMN alt_id")
+
+# Convert both tables to daily-chunked hypertables so old data drops chunk-by-chunk
+async def setup_timescaledb(conn):
+    await conn.execute("CREATE EXTENSION IF NOT EXISTS timescaledb")
+    for table in ("btc_dominance", "alt_btc_strength"):
+        is_hypertable = await conn.fetchval(
+            "SELECT EXISTS (SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = $1)", table
+        )
+        if is_hypertable:
+            continue
+        # Hypertable unique keys must include the partitioning column
+        await conn.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_pkey")
+        await conn.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, timestamp)")
+        await conn.execute(
+            f"SELECT create_hypertable('{table}', 'timestamp', chunk_time_interval => INTERVAL '1 day', migrate_data => TRUE)"
+        )
+    await conn.execute(
+        "SELECT add_retention_policy('alt_btc_strength', $1::interval, if_not_exists => TRUE)", ALT_RETENTION
+    )
+
+# Record a CoinGecko rate limit so the scheduler retries after Retry-After instead of a full interval
+def note_rate_limit(response):
+    global RETRY_AFTER
+    try:
+        delay = max(1, int(response.headers.get("Retry-After", "")))
+    except ValueError:
+        delay = DEFAULT_RETRY_AFTER
+    RETRY_AFTER = max(RETRY_AFTER or 0, delay)
+
+# ALT/BTC market snapshot as parallel lists, one entry per coin
+class AltSoA(NamedTuple):
+    ids: list
+    prices: list
+    vols: list
+
+# Send a request with retries and backoff; returns (response, body), or (None, None) if every attempt failed
+async def http_request(method, url, **kwargs):
+    for attempt in range(HTTP_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(HTTP_BACKOFF * 2 ** (attempt - 1))
+        try:
+            async with SESSION.request(method, url, **kwargs) as response:
+                body = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = repr(e)
+            continue
+        if response.status not in HTTP_RETRY_STATUSES or attempt == HTTP_RETRIES:
+            return response, body
+    # Log the host only; the Telegram URL carries the bot token
+    print(f"{datetime.now()} - {method} {urlsplit(url).netloc} failed after {HTTP_RETRIES + 1} attempts: {error}")
+    return None, None
+
+# Validators from the last response, so unchanged payloads come back as 304 Not Modified
+def conditional_headers(url):
+    headers = {}
+    if url in HTTP_CACHE:
+        etag, last_modified, _ = HTTP_CACHE[url]
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    return headers
+
+def remember_response(url, response, value):
+    HTTP_CACHE[url] = (response.headers.get("ETag"), response.headers.get("Last-Modified"), value)
 
 # Fetch BTC Dominance from CoinGecko
-def fetch_btc_dominance():
-    response = requests.get(COINGECKO_URL)
-    if response.status_code == 200:
-        data = response.json()
+# On 304 the cached value is returned; it is never stored twice since it matches the last stored reading.
+async def fetch_btc_dominance():
+    response, body = await http_request("GET", COINGECKO_URL, headers=conditional_headers(COINGECKO_URL))
+    if response is None:
+        return None
+    if response.status == 200:
+        data = orjson.loads(body)
         btc_dominance = data["data"]["market_cap_percentage"]["btc"]
+        remember_response(COINGECKO_URL, response, btc_dominance)
         return btc_dominance
+    if response.status == 304 and COINGECKO_URL in HTTP_CACHE:
+        return HTTP_CACHE[COINGECKO_URL][2]
+    if response.status == 429:
+        note_rate_limit(response)
     return None
 
 # Fetch ALT/BTC strength from CoinGecko
-def fetch_alt_btc_strength():
-    response = requests.get(COINGECKO_MARKET_URL)
-    if response.status_code == 200:
-        data = response.json()
-        return {coin["id"]: {"btc": coin["current_price"], "volume": coin["total_volume"]} for coin in data}
+# Returns None on 304 as well: there are no new rows to store or rank.
+async def fetch_alt_btc_strength():
+    response, body = await http_request("GET", COINGECKO_MARKET_URL, headers=conditional_headers(COINGECKO_MARKET_URL))
+    if response is None:
+        return None
+    if response.status == 200:
+        data = orjson.loads(body)
+        remember_response(COINGECKO_MARKET_URL, response, None)
+        if not data:
+            return None
+        return AltSoA(
+            [coin["id"] for coin in data],
+            [coin["current_price"] for coin in data],
+            [coin["total_volume"] for coin in data]
+        )
+    if response.status == 429:
+        note_rate_limit(response)
     return None
 
 # Store BTC Dominance in DB
-def store_btc_dominance(btc_dominance):
-    with connect_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute("INSERT INTO btc_dominance (btc_dominance) VALUES (%s)", (btc_dominance,))
-            conn.commit()
+async def store_btc_dominance(conn, btc_dominance):
+    await conn.execute("INSERT INTO btc_dominance (btc_dominance) VALUES ($1)", btc_dominance)
+
+# Look up coins.id for each slug, registering coins not seen before
+async def get_coin_ids(conn, slugs):
+    missing = [slug for slug in slugs if slug not in COIN_IDS]
+    if missing:
+        rows = await conn.fetch("SELECT id, slug FROM coins WHERE slug = ANY($1::text[])", missing)
+        COIN_IDS.update({slug: coin_id for coin_id, slug in rows})
+        new_slugs = [slug for slug in missing if slug not in COIN_IDS]
+        if new_slugs:
+            rows = await conn.fetch(
+                "INSERT INTO coins (slug) SELECT unnest($1::text[]) ON CONFLICT (slug) DO NOTHING RETURNING id, slug", new_slugs
+            )
+            COIN_IDS.update({slug: coin_id for coin_id, slug in rows})
+    return [COIN_IDS[slug] for slug in slugs]
 
 # Store ALT/BTC strength in DB
-def store_alt_btc_strength(alt_data):
-    with connect_db() as conn:
-        with conn.cursor() as cur:
-            for alt_id, value in alt_data.items():
-                cur.execute("INSERT INTO alt_btc_strength (alt_id, alt_btc, volume) VALUES (%s, %s, %s)", (alt_id, value["btc"], value["volume"]))
-            conn.commit()
-
-# Fetch past data for ranking and accumulation detection
-def fetch_past_alt_data():
-    past_data = {}
-    btc_dominance_trend = []
-    time_threshold = datetime.now() - timedelta(days=7)
-    with connect_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT timestamp, btc_dominance FROM btc_dominance WHERE timestamp >= %s", (time_threshold,))
-            btc_dominance_trend = cur.fetchall()
-            cur.execute("SELECT alt_id, alt_btc, volume FROM alt_btc_strength WHERE timestamp >= %s", (time_threshold,))
-            rows = cur.fetchall()
-            for alt_id, alt_btc, volume in rows:
-                if alt_id not in past_data:
-                    past_data[alt_id] = []
-                past_data[alt_id].append((alt_btc, volume))
-    return past_data, btc_dominance_trend
+async def store_alt_btc_strength(conn, coin_ids, alt_data):
+    records = zip(coin_ids, alt_data.prices, alt_data.vols)
+    await conn.copy_records_to_table("alt_btc_strength", records=records, columns=["coin_id", "alt_btc", "volume"])
+
+# Store one iteration's readings in a single transaction
+async def store_snapshot(btc_dominance, alt_data):
+    async with POOL.acquire() as conn:
+        # Resolved before the transaction so COIN_IDS never caches ids from a rolled-back insert
+        coin_ids = await get_coin_ids(conn, alt_data.ids) if alt_data else None
+        async with conn.transaction():
+            if btc_dominance is not None:
+                await store_btc_dominance(conn, btc_dominance)
+            if alt_data:
+                await store_alt_btc_strength(conn, coin_ids, alt_data)
+
+# Rebuild alt_7d_stats after new ALT rows are committed; idempotent, so safe to retry on its own
+async def refresh_alt_stats():
+    # REFRESH ... CONCURRENTLY can't run inside a transaction block
+    await POOL.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY alt_7d_stats")
+
+# Fetch 7-day price/volume stats per alt from alt_7d_stats and the BTC dominance change
+# Both 7-day windows use the server clock, the same one that stamps the rows
+async def fetch_past_alt_data():
+    async with POOL.acquire() as conn:
+        btc_dominance_change = await conn.fetchval('''
+            SELECT last_value(btc_dominance) OVER w - first_value(btc_dominance) OVER w
+            FROM btc_dominance
+            WHERE timestamp >= LOCALTIMESTAMP - INTERVAL '7 days'
+            WINDOW w AS (ORDER BY timestamp ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+            LIMIT 1
+        ''')
+        alt_stats = await conn.fetch('''
+            SELECT c.slug AS alt_id,
+                   (s.latest_price - s.first_price) / s.first_price AS price_change,
+                   s.latest_volume,
+                   s.avg_volume,
+                   s.latest_volume > s.avg_volume * $1 AS accumulating
+            FROM alt_7d_stats s
+            JOIN coins c ON c.id = s.coin_id
+            WHERE s.samples >= 2
+        ''', ACCUMULATION_VOLUME_SPIKE)
+    return alt_stats, btc_dominance_change or 0
 
 # Identify ranking and accumulation
-def analyze_alts():
-    past_data, btc_dominance_trend = fetch_past_alt_data()
+async def analyze_alts():
+    alt_stats, btc_dominance_change = await fetch_past_alt_data()
     rankings = {}
     accumulation_alerts = []
-    
-    btc_dominance_change = (btc_dominance_trend[-1][1] - btc_dominance_trend[0][1]) if len(btc_dominance_trend) >= 2 else 0
+
     btc_dominance_rising = btc_dominance_change > 0
 
-    for alt_id, records in past_data.items():
-        if len(records) < 2:
-            continue
-        initial_price = records[0][0]
-        latest_price = records[-1][0]
-        avg_volume = sum(r[1] or 0 for r in records) / len(records)
-        latest_volume = records[-1][1]
-        price_change = (latest_price - initial_price) / initial_price
+    for alt_id, price_change, latest_volume, avg_volume, accumulating in alt_stats:
         relative_strength = price_change - btc_dominance_change if btc_dominance_rising else price_change
         rankings[alt_id] = relative_strength
-        
-        if latest_volume > avg_volume * ACCUMULATION_VOLUME_SPIKE:
+
+        if accumulating:
             accumulation_alerts.append(f"{alt_id.upper()} shows accumulation! Volume spike: {latest_volume:.2f} (Avg: {avg_volume:.2f})")
-    
-    top_alts = sorted(rankings.items(), key=lambda x: x[1], reverse=True)[:5]
+
+    top_alts = heapq.nlargest(5, rankings.items(), key=lambda x: x[1])
     return top_alts, accumulation_alerts
 
-# Console alert function
-def send_alert(message):
-    print(f"ALERT: {message}")
+# Threshold alert, only when BTC Dominance crosses into a new zone
+def check_btc_dominance_thresholds(btc_dominance):
+    global LAST_ALERT_STATE
+    if btc_dominance > BTC_DOMINANCE_HIGH:
+        new_state = "above_high"
+    elif btc_dominance < BTC_DOMINANCE_LOW:
+        new_state = "below_low"
+    else:
+        new_state = "neutral"
+    if new_state == LAST_ALERT_STATE:
+        return None
+    LAST_ALERT_STATE = new_state
+    if new_state == "above_high":
+        return HIGH_PREFIX + f"{btc_dominance:.2f}%"
+    if new_state == "below_low":
+        return LOW_PREFIX + f"{btc_dominance:.2f}%"
+    return None
 
-# Telegram alert function
-def send_telegram_alert(message):
+# Console + Telegram alert function
+async def notify(message):
+    print(f"ALERT: {message}")
     payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message}
-    requests.post(TELEGRAM_URL, data=payload)
-    print(f"TELEGRAM ALERT SENT: {message}")
+    await http_request("POST", TELEGRAM_URL, data=payload)
 
 # Main function to run the tracker
-def main():
-    setup_database()
-    send_alert("BTC Dominance Tracker Started.")
-    send_telegram_alert("BTC Dominance Tracker Started.")
-    
-    while True:
-        btc_dominance = fetch_btc_dominance()
-        alt_data = fetch_alt_btc_strength()
-        
-        if btc_dominance:
-            print(f"{datetime.now()} - BTC Dominance: {btc_dominance:.2f}%")
-            store_btc_dominance(btc_dominance)
-            send_telegram_alert(f"BTC Dominance: {btc_dominance:.2f}%")
-        
-        if alt_data:
-            store_alt_btc_strength(alt_data)
-            top_alts, accumulation_alerts = analyze_alts()
-            send_telegram_alert(f"Top Alts: {', '.join(f'{alt.upper()} ({change:.2%})' for alt, change in top_alts)}")
-            for alert in accumulation_alerts:
-                send_telegram_alert(alert)
-        
-        time.sleep(300)
+async def main():
+    global POOL, SESSION, LAST_BTC_DOM, RETRY_AFTER
+    POOL = await connect_db()
+    SESSION = create_session()
+    try:
+        await asyncio.gather(setup_database(), notify("BTC Dominance Tracker Started."))
+
+        next_tick = time.monotonic()
+        while True:
+            btc_dominance, alt_data = await asyncio.gather(fetch_btc_dominance(), fetch_alt_btc_strength())
+
+            dominance_to_store = None
+            # Everything worth reporting this iteration goes out as a single Telegram message
+            lines = []
+            if btc_dominance:
+                print(f"{datetime.now()} - BTC Dominance: {btc_dominance:.2f}%")
+                if LAST_BTC_DOM is None or abs(btc_dominance - LAST_BTC_DOM) >= BTC_DOMINANCE_MIN_CHANGE:
+                    dominance_to_store = btc_dominance
+                    lines.append(f"BTC Dominance: {btc_dominance:.2f}%")
+                threshold_alert = check_btc_dominance_thresholds(btc_dominance)
+                if threshold_alert:
+                    lines.append(threshold_alert)
+            try:
+                if dominance_to_store is not None or alt_data:
+                    await with_db_retry(store_snapshot, dominance_to_store, alt_data)
+                    if dominance_to_store is not None:
+                        LAST_BTC_DOM = dominance_to_store
+
+                if alt_data:
+                    # Retried separately from the insert so a dropped connection here never re-inserts the snapshot
+                    await with_db_retry(refresh_alt_stats)
+                    top_alts, accumulation_alerts = await with_db_retry(analyze_alts)
+                    lines.append(TOP_ALTS_PREFIX + ", ".join([f"{alt.upper()} ({change:.2%})" for alt, change in top_alts]))
+                    lines.extend(accumulation_alerts)
+            except DB_CONNECTION_ERRORS as e:
+                # Keep the tracker running; the next tick tries the database again
+                print(f"{datetime.now()} - Database unavailable, skipping this tick's DB work: {e!r}")
+
+            if lines:
+                await notify("\n".join(lines))
+
+            # Schedule off a monotonic clock so the period doesn't drift by the iteration's own runtime
+            now = time.monotonic()
+            if RETRY_AFTER is not None:
+                # Only positive jitter here, so the retry never lands before Retry-After
+                next_tick = now + RETRY_AFTER
+                RETRY_AFTER = None
+                jitter = random.uniform(0, POLL_JITTER)
+            else:
+                next_tick = max(next_tick + POLL_INTERVAL, now)
+                jitter = random.uniform(-POLL_JITTER, POLL_JITTER)
+            await asyncio.sleep(max(0, next_tick - now + jitter))
+    finally:
+        await SESSION.close()
+        await POOL.close()
 
 if __name__ == "__main__":
-    main()
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(main())